@@ -0,0 +1,45 @@
+# -*- coding: utf-8 -*-
+
+import os
+import hmac
+import base64
+import orjson
+import hashlib
+
+
+_b64 = base64.urlsafe_b64encode
+_sha512 = hashlib.sha512
+_hmac_digest = hmac.digest
+_dumps = orjson.dumps
+_urandom = os.urandom
+
+# JWT header 는 항상 같으므로 미리 인코딩해 둔다.
+_HEADER_B64 = _b64(b'{"typ":"JWT","alg":"HS256"}').rstrip(b"=")
+
+
+def build_upbit_jwt(
+    access_key: str, secret_key: bytes, query: bytes = None, nonce: str = None
+) -> bytes:
+    """UPBIT 인증 헤더 값 생성
+    query_hash(SHA512) 계산, payload 직렬화, HS256 서명을 한 번에 처리한다.
+
+    Args:
+      access_key (str): access key
+      secret_key (bytes): secret key
+      query (bytes): url 인코딩된 요청 파라미터. 없으면 None
+      nonce (str): 요청마다 달라지는 값. 없으면 새로 만든다.
+
+    Returns:
+      b"Bearer {jwt token}"
+    """
+    if nonce is None:
+        nonce = _urandom(16).hex()
+
+    payload = {"access_key": access_key, "nonce": nonce}
+    if query:
+        payload["query_hash"] = _sha512(query).hexdigest()
+        payload["query_hash_alg"] = "SHA512"
+
+    signing_input = _HEADER_B64 + b"." + _b64(_dumps(payload)).rstrip(b"=")
+    signature = _hmac_digest(secret_key, signing_input, "sha256")
+    return b"Bearer " + signing_input + b"." + _b64(signature).rstrip(b"=")
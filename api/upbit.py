@@ -1,29 +1,18 @@
 # -*- coding: utf-8 -*-
 
 import os
-import jwt
-import uuid
-import requests
-import hashlib
+import orjson
 import enum
 import logging
-import functools
 from urllib.parse import urlencode
+from concurrent.futures import ThreadPoolExecutor
+from api._auth import build_upbit_jwt
 
 
-log = logging.getLogger(f"mybit.{__name__}")
+log = logging.getLogger("mybit." + __name__)
 
-
-def decorator(func):
-    @functools.wraps(func)
-    def wrapper(*args, **kwargs):
-        try:
-            return func(*args, **kwargs)
-        except requests.exceptions.HTTPError as e:
-            log.error(e)
-            raise
-
-    return wrapper
+# connection pool 크기. order_bid_many 의 thread 수도 이 값을 넘지 않는다.
+_POOL_MAXSIZE = 10
 
 
 class OrderType(enum.Enum):
@@ -42,16 +31,52 @@ class Side(enum.Enum):
     ASK = "ask"  # 매도
 
 
-class UPBitApi:
-    """UPBIT api
+# 매수 주문 query 의 고정된 앞부분 (market, side, ord_type)
+_BID_BASE = {
+    (m, o): urlencode(
+        {"market": m.value, "side": Side.BID.value, "ord_type": o.value}
+    ).encode()
+    for m in Market
+    for o in OrderType
+}
+
+
+class UPBitHTTPError(Exception):
+    """UPBIT api 가 4xx, 5xx 응답을 돌려줄 때 발생한다.
+
+    Attributes:
+      status (int): HTTP status code
+      data (bytes): 응답 body. UPBIT 는 {"error": {"name": ..., "message": ...}} 형태로 준다.
+    """
+
+    def __init__(self, status: int, data: bytes):
+        super().__init__(f"{status} {data!r}")
+        self.status = status
+        self.data = data
+
+
+class BaseUPBitApi:
+    """UPBIT api 공통 부분
+    인증 정보와 endpoint 별 요청 구성을 담당한다.
+    실제 전송은 하위 클래스의 _request_tmpl 이 맡는다.
+    요청이 실패하면 UPBitHTTPError 가 발생한다.
     https://docs.upbit.com/reference
     """
 
+    __slots__ = (
+        "access_key",
+        "secret_key",
+        "server_url",
+        "_signing_key",
+    )
+
     def __init__(self):
         self.access_key = os.environ["UPBIT_OPEN_API_ACCESS_KEY"]
         self.secret_key = os.environ["UPBIT_OPEN_API_SECRET_KEY"]
         self.server_url = os.environ["UPBIT_OPEN_API_SERVER_URL"]
 
+        self._signing_key = self.secret_key.encode()
+
     def get_market_all(self) -> list:
         """마켓 코드 조회
         업비트에서 거래 가능한 마켓 목록
@@ -70,7 +95,7 @@ class UPBitApi:
 
         """
         return self._request_get(
-            f"{self.server_url}/v1/market/all", params={"isDetails": "false"}
+            f"{self.server_url}/v1/market/all", params=b"isDetails=false"
         )
 
     def get_orders_chance(self, market: str) -> dict:
@@ -129,27 +154,10 @@ class UPBitApi:
             }
             }
         """
-        query = {
-            "market": market,
-        }
-        query_string = urlencode(query).encode()
-
-        m = hashlib.sha512()
-        m.update(query_string)
-        query_hash = m.hexdigest()
-
-        payload = {
-            "access_key": self.access_key,
-            "nonce": str(uuid.uuid4()),
-            "query_hash": query_hash,
-            "query_hash_alg": "SHA512",
-        }
-
-        jwt_token = jwt.encode(payload, self.secret_key)
-        authorize_token = "Bearer {}".format(jwt_token)
-        headers = {"Authorization": authorize_token}
+        query_string = b"market=" + market.encode()
+        headers = self._auth_headers(query_string)
         return self._request_get(
-            f"{self.server_url}/v1/orders/chance", params=query, headers=headers
+            f"{self.server_url}/v1/orders/chance", params=query_string, headers=headers
         )
 
     def get_accounts(self) -> list:
@@ -187,14 +195,7 @@ class UPBitApi:
             }
         ]
         """
-        payload = {
-            "access_key": self.access_key,
-            "nonce": str(uuid.uuid4()),
-        }
-
-        jwt_token = jwt.encode(payload, self.secret_key)
-        authorize_token = "Bearer {}".format(jwt_token)
-        headers = {"Authorization": authorize_token}
+        headers = self._auth_headers()
         return self._request_get(f"{self.server_url}/v1/accounts", headers=headers)
 
     def deposits_krw(self, amount_krw: int):
@@ -218,25 +219,10 @@ class UPBitApi:
         }
         """
 
-        query = {"amount": str(amount_krw)}
-        query_string = urlencode(query).encode()
-
-        m = hashlib.sha512()
-        m.update(query_string)
-        query_hash = m.hexdigest()
-
-        payload = {
-            "access_key": self.access_key,
-            "nonce": str(uuid.uuid4()),
-            "query_hash": query_hash,
-            "query_hash_alg": "SHA512",
-        }
-
-        jwt_token = jwt.encode(payload, self.secret_key)
-        authorize_token = "Bearer {}".format(jwt_token)
-        headers = {"Authorization": authorize_token}
+        query_string = b"amount=" + str(amount_krw).encode()
+        headers = self._auth_headers(query_string)
         return self._request_post(
-            f"{self.server_url}/v1/deposits/krw", params=query, headers=headers
+            f"{self.server_url}/v1/deposits/krw", params=query_string, headers=headers
         )
 
     def order_bid(
@@ -245,6 +231,9 @@ class UPBitApi:
         order_type: OrderType,
         volume: int = None,
         price: int = None,
+        *,
+        _bid_base=_BID_BASE,
+        _str=str,
     ) -> dict:
         """매수 주문 요청
 
@@ -285,39 +274,126 @@ class UPBitApi:
         }
 
         """
-        query = {"market": market.value, "side": "bid", "ord_type": order_type.value}
+        query_string = _bid_base[(market, order_type)]
         if volume is not None:
-            query["volume"] = str(volume)
+            query_string += b"&volume=" + _str(volume).encode()
         if price is not None:
-            query["price"] = str(price)
+            query_string += b"&price=" + _str(price).encode()
 
-        query_string = urlencode(query).encode()
+        headers = self._auth_headers(query_string)
+        return self._request_post(
+            f"{self.server_url}/v1/orders", params=query_string, headers=headers
+        )
 
-        m = hashlib.sha512()
-        m.update(query_string)
-        query_hash = m.hexdigest()
+    def _auth_headers(
+        self,
+        query_string: bytes = None,
+        *,
+        _build_upbit_jwt=build_upbit_jwt,
+    ) -> dict:
+        """인증 헤더 생성
+        query_string 이 있으면 query_hash 를 payload 에 포함한다.
 
-        payload = {
-            "access_key": self.access_key,
-            "nonce": str(uuid.uuid4()),
-            "query_hash": query_hash,
-            "query_hash_alg": "SHA512",
-        }
+        Args:
+          query_string (bytes): url 인코딩된 요청 파라미터
 
-        jwt_token = jwt.encode(payload, self.secret_key)
-        authorize_token = "Bearer {}".format(jwt_token)
-        headers = {"Authorization": authorize_token}
-        return self._request_post(
-            f"{self.server_url}/v1/orders", params=query, headers=headers
-        )
+        Returns:
+          {"Authorization": b"Bearer ..."}
+        """
+        token = _build_upbit_jwt(self.access_key, self._signing_key, query_string)
+        return {"Authorization": token}
 
     def _request_get(self, url, params=None, headers=None):
-        return self._request_tmpl(requests.get, url, params, headers)
+        return self._request_tmpl("GET", url, params, headers)
 
     def _request_post(self, url, params=None, headers=None):
-        return self._request_tmpl(requests.post, url, params, headers)
+        return self._request_tmpl("POST", url, params, headers)
+
+    def _request_tmpl(self, method, url, params, headers):
+        raise NotImplementedError
+
+    def _raise_for_status(self, method, url, status, data):
+        if status >= 400:
+            log.error("%s %s -> %s %s", method, url, status, data)
+            raise UPBitHTTPError(status, data)
+
+
+class UPBitApi(BaseUPBitApi):
+    """UPBIT api
+    https://docs.upbit.com/reference
+    """
+
+    __slots__ = ("_pool",)
+
+    def __init__(self):
+        # urllib3(ssl) 는 import 비용이 커서 인스턴스를 만들 때 불러온다.
+        import certifi
+        import urllib3
+
+        super().__init__()
+
+        # 요청마다 TCP/TLS 연결을 새로 맺지 않도록 connection pool 을 재사용한다.
+        self._pool = urllib3.PoolManager(
+            num_pools=2,
+            maxsize=_POOL_MAXSIZE,
+            cert_reqs="CERT_REQUIRED",
+            ca_certs=certifi.where(),
+        )
+
+    def get_market_all(self) -> list:
+        """마켓 코드 조회
+        iter_markets 의 결과를 list 로 반환한다.
+        """
+        return list(self.iter_markets())
+
+    def iter_markets(self, filter_fn=None):
+        """마켓 코드 조회 (streaming)
+        응답 전체를 읽지 않고 마켓을 하나씩 parsing 하여 돌려준다.
+
+        Args:
+          filter_fn: 마켓 dict 를 받아 bool 을 반환하는 함수. True 인 마켓만 반환한다.
+
+        Yields:
+          get_market_all 의 마켓 dict
+        """
+        import ijson
+
+        url = f"{self.server_url}/v1/market/all?isDetails=false"
+        r = self._pool.request("GET", url, preload_content=False)
+        try:
+            if r.status >= 400:
+                self._raise_for_status("GET", url, r.status, r.data)
+            for item in ijson.items(r, "item", use_float=True):
+                if filter_fn is None or filter_fn(item):
+                    yield item
+        finally:
+            r.release_conn()
+
+    def order_bid_many(self, orders: list) -> list:
+        """여러 매수 주문 동시 요청
+        각 주문을 별도 thread 에서 요청하며 connection pool 을 공유한다.
+
+        Args:
+        orders (list): (market, order_type, volume, price) tuple 의 list
+
+        Return:
+        order_bid 응답의 list (orders 와 같은 순서)
+        실패한 주문은 해당 위치에 exception 이 들어간다. 나머지 주문은 이미
+        체결 요청된 상태이므로 결과를 버리지 않는다.
+        """
+        if not orders:
+            return []
+
+        max_workers = min(len(orders), _POOL_MAXSIZE)
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = [executor.submit(self.order_bid, *order) for order in orders]
+        return [f.exception() or f.result() for f in futures]
+
+    def _request_tmpl(self, method, url, params, headers):
+        """params 는 url 인코딩된 query string (bytes)"""
+        if params:
+            url = url + "?" + params.decode()
+        r = self._pool.request(method, url, headers=headers)
+        self._raise_for_status(method, url, r.status, r.data)
+        return orjson.loads(r.data)
 
-    def _request_tmpl(self, req_func, url, params, headers):
-        r = req_func(url, params=params, headers=headers)
-        r.raise_for_status()
-        return r.json()
@@ -0,0 +1,85 @@
+# -*- coding: utf-8 -*-
+
+import httpx
+import orjson
+import asyncio
+
+from api.upbit import BaseUPBitApi
+
+
+class _AsyncBodyReader:
+    """httpx streaming 응답을 ijson 이 읽을 수 있는 async file 로 감싼다."""
+
+    def __init__(self, response):
+        self._chunks = response.aiter_bytes()
+
+    async def read(self, size=-1):
+        # ijson 은 read(0) 으로 bytes/str 여부를 확인한다.
+        if size == 0:
+            return b""
+        async for chunk in self._chunks:
+            if chunk:
+                return chunk
+        return b""
+
+
+class AsyncUPBitApi(BaseUPBitApi):
+    """UPBIT api (asyncio)
+    UPBitApi 와 같은 메소드를 제공하며, 각 메소드는 coroutine 을 반환한다.
+    (iter_markets 는 async generator)
+    하나의 HTTP/2 연결 위에서 여러 요청을 동시에 보낼 수 있다.
+
+    example:
+      api = AsyncUPBitApi()
+      r1, r2 = await asyncio.gather(api.get_accounts(), api.get_market_all())
+    """
+
+    __slots__ = ("_client",)
+
+    def __init__(self):
+        super().__init__()
+        self._client = httpx.AsyncClient(http2=True)
+
+    async def aclose(self):
+        await self._client.aclose()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.aclose()
+
+    async def iter_markets(self, filter_fn=None):
+        """UPBitApi.iter_markets 의 async generator 판
+
+        example:
+          async for market in api.iter_markets(filter_fn):
+              ...
+        """
+        import ijson
+
+        url = f"{self.server_url}/v1/market/all?isDetails=false"
+        async with self._client.stream("GET", url) as r:
+            if r.status_code >= 400:
+                await r.aread()
+                self._raise_for_status("GET", url, r.status_code, r.content)
+            body = _AsyncBodyReader(r)
+            async for item in ijson.items_async(body, "item", use_float=True):
+                if filter_fn is None or filter_fn(item):
+                    yield item
+
+    async def order_bid_many(self, orders: list) -> list:
+        """UPBitApi.order_bid_many 와 같다. 실패한 주문은 exception 으로 반환한다."""
+        return list(
+            await asyncio.gather(
+                *(self.order_bid(*order) for order in orders), return_exceptions=True
+            )
+        )
+
+    async def _request_tmpl(self, method, url, params, headers):
+        """params 는 url 인코딩된 query string (bytes)"""
+        if params:
+            url = url + "?" + params.decode()
+        r = await self._client.request(method, url, headers=headers)
+        self._raise_for_status(method, url, r.status_code, r.content)
+        return orjson.loads(r.content)
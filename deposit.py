@@ -1,15 +1,18 @@
-import json
-import dotenv
+import orjson
 import logging
 from api.upbit import UPBitApi
 
-dotenv.load_dotenv(verbose=False)
-log = logging.getLogger(f"mybit.{__name__}")
-log.setLevel(logging.INFO)
-log.addHandler(logging.StreamHandler())
+log = logging.getLogger("mybit." + __name__)
 
-api = UPBitApi()
+if __name__ == "__main__":
+    import dotenv
 
-# 80000 원 K뱅크에서 인출 요청(카카오 인증)
-response = api.deposits_krw(80000)
-print(json.dumps(response, indent=4))
+    dotenv.load_dotenv(verbose=False)
+    log.setLevel(logging.INFO)
+    log.addHandler(logging.StreamHandler())
+
+    api = UPBitApi()
+
+    # 80000 원 K뱅크에서 인출 요청(카카오 인증)
+    response = api.deposits_krw(80000)
+    print(orjson.dumps(response, option=orjson.OPT_INDENT_2).decode())
@@ -1,19 +1,28 @@
-import json
+import orjson
 
-import dotenv
 import logging
 from api.upbit import UPBitApi, Market, OrderType
 
-dotenv.load_dotenv(verbose=False)
-log = logging.getLogger(f"mybit.{__name__}")
-log.setLevel(logging.INFO)
-log.addHandler(logging.StreamHandler())
+log = logging.getLogger("mybit." + __name__)
 
-api = UPBitApi()
+if __name__ == "__main__":
+    import dotenv
 
-# KRW-BTC 10,000 KRW 매수
-response = api.order_bid(Market.KRW_BTC, OrderType.PRICE, price=10000)
-print(json.dumps(response, indent=4))
-# KRW-ETH 10,000 KRW 매수
-response = api.order_bid(Market.KRW_ETH, OrderType.PRICE, price=10000)
-print(json.dumps(response, indent=4))
+    dotenv.load_dotenv(verbose=False)
+    log.setLevel(logging.INFO)
+    log.addHandler(logging.StreamHandler())
+
+    api = UPBitApi()
+
+    # KRW-BTC, KRW-ETH 각 10,000 KRW 동시 매수
+    responses = api.order_bid_many(
+        [
+            (Market.KRW_BTC, OrderType.PRICE, None, 10000),
+            (Market.KRW_ETH, OrderType.PRICE, None, 10000),
+        ]
+    )
+    for response in responses:
+        if isinstance(response, Exception):
+            log.error("order failed: %s", response)
+            continue
+        print(orjson.dumps(response, option=orjson.OPT_INDENT_2).decode())
@@ -1,12 +1,42 @@
+import io
+import os
 import json
+import jwt
+import httpx
+import orjson
+import asyncio
+import hashlib
 import logging
 import unittest
-from api.upbit import UPBitApi
+from unittest import mock
+from concurrent.futures import ThreadPoolExecutor
+from urllib3 import HTTPResponse
+from urllib.parse import urlencode
+from api.upbit import UPBitApi, UPBitHTTPError, Market, OrderType, _POOL_MAXSIZE
+from api.upbit_async import AsyncUPBitApi
+from api._auth import build_upbit_jwt
 
 log = logging.getLogger("mybit")
 log.setLevel(logging.INFO)
 log.addHandler(logging.StreamHandler())
 
+TEST_ENV = {
+    "UPBIT_OPEN_API_ACCESS_KEY": "access-key",
+    "UPBIT_OPEN_API_SECRET_KEY": "secret-key",
+    "UPBIT_OPEN_API_SERVER_URL": "https://api.upbit.com",
+}
+
+MARKETS = [
+    {"market": "KRW-BTC", "korean_name": "비트코인", "english_name": "Bitcoin"},
+    {"market": "BTC-ETH", "korean_name": "이더리움", "english_name": "Ethereum"},
+]
+
+
+def decode_auth_header(header: bytes) -> dict:
+    scheme, token = header.decode().split(" ")
+    assert scheme == "Bearer"
+    return jwt.decode(token, "secret-key", algorithms=["HS256"])
+
 
 class SomeTestCase(unittest.TestCase):
     def tearDown(self):
@@ -19,3 +49,210 @@ class SomeTestCase(unittest.TestCase):
         res = self.api.get_accounts()
         assert res
         log.info(json.dumps(res, indent=4))
+
+
+class AuthHeadersTestCase(unittest.TestCase):
+    def setUp(self):
+        with mock.patch.dict(os.environ, TEST_ENV):
+            self.api = UPBitApi()
+
+    def test_without_query(self):
+        payload = decode_auth_header(self.api._auth_headers()["Authorization"])
+        self.assertEqual(payload["access_key"], "access-key")
+        self.assertTrue(payload["nonce"])
+        self.assertNotIn("query_hash", payload)
+
+    def test_with_query(self):
+        query = {"market": "KRW-BTC", "side": "bid", "ord_type": "price"}
+        query_string = urlencode(query).encode()
+        headers = self.api._auth_headers(query_string)
+        payload = decode_auth_header(headers["Authorization"])
+        query_hash = hashlib.sha512(query_string).hexdigest()
+        self.assertEqual(payload["query_hash"], query_hash)
+        self.assertEqual(payload["query_hash_alg"], "SHA512")
+
+    def test_nonce_is_unique(self):
+        first = decode_auth_header(self.api._auth_headers()["Authorization"])
+        second = decode_auth_header(self.api._auth_headers()["Authorization"])
+        self.assertNotEqual(first["nonce"], second["nonce"])
+
+
+class AsyncUPBitApiTestCase(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        with mock.patch.dict(os.environ, TEST_ENV):
+            self.api = AsyncUPBitApi()
+        await self.api.aclose()
+        self.requests = []
+        self.failing_markets = set()
+        self.api._client = httpx.AsyncClient(transport=httpx.MockTransport(self.handle))
+
+    async def asyncTearDown(self):
+        await self.api.aclose()
+
+    def handle(self, request):
+        self.requests.append(request)
+        if request.url.path == "/v1/market/all":
+            return httpx.Response(200, content=orjson.dumps(MARKETS))
+        market = request.url.params["market"]
+        status = 400 if market in self.failing_markets else 200
+        return httpx.Response(status, json={"market": market})
+
+    async def test_order_bid_gather(self):
+        responses = await asyncio.gather(
+            self.api.order_bid(Market.KRW_BTC, OrderType.PRICE, price=10000),
+            self.api.order_bid(Market.KRW_ETH, OrderType.PRICE, price=10000),
+        )
+        self.assertEqual(responses, [{"market": "KRW-BTC"}, {"market": "KRW-ETH"}])
+        for request in self.requests:
+            self.assertEqual(request.method, "POST")
+            self.assertEqual(request.url.path, "/v1/orders")
+            self.assertTrue(request.headers["Authorization"].startswith("Bearer "))
+            token = request.headers["Authorization"].split(" ")[1]
+            payload = jwt.decode(token, "secret-key", algorithms=["HS256"])
+            query_hash = hashlib.sha512(request.url.query).hexdigest()
+            self.assertEqual(payload["query_hash"], query_hash)
+
+    async def test_iter_markets(self):
+        self.assertEqual(await self.api.get_market_all(), MARKETS)
+        krw_markets = [
+            market
+            async for market in self.api.iter_markets(
+                lambda m: m["market"].startswith("KRW-")
+            )
+        ]
+        self.assertEqual(krw_markets, MARKETS[:1])
+
+    async def test_order_bid_many_partial_failure(self):
+        self.failing_markets.add("KRW-ETH")
+        responses = await self.api.order_bid_many(
+            [
+                (Market.KRW_BTC, OrderType.PRICE, None, 10000),
+                (Market.KRW_ETH, OrderType.PRICE, None, 10000),
+            ]
+        )
+        self.assertEqual(responses[0], {"market": "KRW-BTC"})
+        self.assertIsInstance(responses[1], UPBitHTTPError)
+        self.assertEqual(responses[1].status, 400)
+
+
+class BuildUpbitJwtTestCase(unittest.TestCase):
+    def test_with_query(self):
+        query = b"market=KRW-BTC"
+        header = build_upbit_jwt("access-key", b"secret-key", query, "nonce")
+        self.assertEqual(
+            decode_auth_header(header),
+            {
+                "access_key": "access-key",
+                "nonce": "nonce",
+                "query_hash": hashlib.sha512(query).hexdigest(),
+                "query_hash_alg": "SHA512",
+            },
+        )
+        token = header.decode().split(" ")[1]
+        self.assertEqual(
+            jwt.get_unverified_header(token), {"typ": "JWT", "alg": "HS256"}
+        )
+
+    def test_without_query(self):
+        payload = decode_auth_header(build_upbit_jwt("access-key", b"secret-key"))
+        self.assertEqual(payload["access_key"], "access-key")
+        self.assertTrue(payload["nonce"])
+        self.assertNotIn("query_hash", payload)
+
+
+class QueryHashTestCase(unittest.TestCase):
+    def setUp(self):
+        with mock.patch.dict(os.environ, TEST_ENV):
+            self.api = UPBitApi()
+        patcher = mock.patch.object(UPBitApi, "_request_tmpl", return_value={})
+        self.request_tmpl = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def assert_query_hash(self):
+        _, _, params, headers = self.request_tmpl.call_args[0]
+        self.assertIsInstance(params, bytes)
+        payload = decode_auth_header(headers["Authorization"])
+        self.assertEqual(payload["query_hash"], hashlib.sha512(params).hexdigest())
+
+    def test_get_orders_chance(self):
+        self.api.get_orders_chance("KRW-BTC")
+        self.assert_query_hash()
+
+    def test_deposits_krw(self):
+        self.api.deposits_krw(80000)
+        self.assert_query_hash()
+
+    def test_order_bid(self):
+        self.api.order_bid(Market.KRW_BTC, OrderType.LIMIT, volume=1, price=5000)
+        self.assert_query_hash()
+
+    def test_order_bid_many(self):
+        self.request_tmpl.side_effect = lambda method, url, params, headers: params
+        orders = [
+            (Market.KRW_BTC, OrderType.PRICE, None, 10000),
+            (Market.KRW_ETH, OrderType.PRICE, None, 10000),
+        ]
+        responses = self.api.order_bid_many(orders)
+        self.assertEqual(
+            responses,
+            [
+                b"market=KRW-BTC&side=bid&ord_type=price&price=10000",
+                b"market=KRW-ETH&side=bid&ord_type=price&price=10000",
+            ],
+        )
+        self.assertEqual(self.api.order_bid_many([]), [])
+
+    def test_order_bid_many_caps_workers(self):
+        orders = [(Market.KRW_BTC, OrderType.PRICE, None, 10000)] * (_POOL_MAXSIZE + 5)
+        executor = mock.patch("api.upbit.ThreadPoolExecutor", wraps=ThreadPoolExecutor)
+        with executor as tpe:
+            responses = self.api.order_bid_many(orders)
+        self.assertEqual(len(responses), len(orders))
+        tpe.assert_called_once_with(max_workers=_POOL_MAXSIZE)
+
+    def test_order_bid_many_partial_failure(self):
+        error = UPBitHTTPError(400, b"{}")
+
+        def request_tmpl(method, url, params, headers):
+            if b"KRW-ETH" in params:
+                raise error
+            return params
+
+        self.request_tmpl.side_effect = request_tmpl
+        orders = [
+            (Market.KRW_BTC, OrderType.PRICE, None, 10000),
+            (Market.KRW_ETH, OrderType.PRICE, None, 10000),
+        ]
+        responses = self.api.order_bid_many(orders)
+        self.assertEqual(
+            responses, [b"market=KRW-BTC&side=bid&ord_type=price&price=10000", error]
+        )
+
+
+class RequestTmplTestCase(unittest.TestCase):
+    def setUp(self):
+        with mock.patch.dict(os.environ, TEST_ENV):
+            self.api = UPBitApi()
+        self.api._pool = mock.Mock()
+
+    def test_query_string_in_url(self):
+        self.api._pool.request.return_value = mock.Mock(status=200, data=b"{}")
+        res = self.api.get_orders_chance("KRW-BTC")
+        self.assertEqual(res, {})
+        url = self.api._pool.request.call_args[0][1]
+        self.assertEqual(url, "https://api.upbit.com/v1/orders/chance?market=KRW-BTC")
+
+    def test_iter_markets(self):
+        self.api._pool.request.side_effect = lambda *args, **kwargs: HTTPResponse(
+            body=io.BytesIO(orjson.dumps(MARKETS)), status=200, preload_content=False
+        )
+        self.assertEqual(self.api.get_market_all(), MARKETS)
+        krw_markets = self.api.iter_markets(lambda m: m["market"].startswith("KRW-"))
+        self.assertEqual(list(krw_markets), MARKETS[:1])
+
+    def test_http_error(self):
+        self.api._pool.request.return_value = mock.Mock(status=401, data=b"{}")
+        with self.assertRaises(UPBitHTTPError) as cm:
+            self.api.get_accounts()
+        self.assertEqual(cm.exception.status, 401)
+        self.assertEqual(cm.exception.data, b"{}")